@@ -24,8 +24,8 @@ def main():
     parser.add_argument(
         "-o",
         "--output",
-        default="tree_structure.txt",
-        help="Output file path (default: tree_structure.txt)",
+        default=None,
+        help="Output file path (default: tree_structure.txt; with --embed, only written when given explicitly)",
     )
     parser.add_argument(
         "-i",
@@ -58,6 +58,14 @@ def main():
         default=42,
         help="Column position for annotations (default: 42)",
     )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=".annotree_cache",
+        default=None,
+        metavar="PATH",
+        help="Cache file descriptions on disk to speed up repeated runs (default path: .annotree_cache)",
+    )
     parser.add_argument(
         "--no-annotate",
         action="store_true",
@@ -91,31 +99,36 @@ def main():
 
     print(f"Generating tree structure for: {dir_path.absolute()}")
 
-    # If embedding requested, skip writing to output file and embed directly
+    # If embedding requested, generate once and reuse the lines for both sinks
     if args.embed:
-        from .annotree import embed_tree_in_file
+        from .annotree import _embed_text
 
         target = Path(args.embed)
         print(f"Embedding tree into: {target}")
-        changed = embed_tree_in_file(
-            target_file=target,
+        dirs, files, lines = tree(
             dir_path=dir_path,
-            start_tag=args.start_tag,
-            end_tag=args.end_tag,
             ignore_file=args.ignore,
             level=args.level,
             limit_to_directories=args.directories_only,
             length_limit=args.limit,
+            output_file=None,
             annotation_start=args.annotation_start,
             annotate=not args.no_annotate,
+            cache_file=args.cache,
         )
+        tree_text = "\n".join(lines)
+        if args.output:
+            Path(args.output).write_text(tree_text + "\n", encoding="utf-8")
+            print(f"✓ Tree structure saved to '{args.output}'")
+        changed = _embed_text(target, tree_text, start_tag=args.start_tag, end_tag=args.end_tag)
         if changed:
             print("✓ Embedded tree into file (file updated).")
         else:
             print("No changes made when embedding (tags missing or no diff).")
     else:
         # Normal file output mode
-        print(f"Output file: {args.output}")
+        output = args.output or "tree_structure.txt"
+        print(f"Output file: {output}")
 
         dirs, files = tree(
             dir_path=dir_path,
@@ -123,12 +136,13 @@ def main():
             level=args.level,
             limit_to_directories=args.directories_only,
             length_limit=args.limit,
-            output_file=args.output,
+            output_file=output,
             annotation_start=args.annotation_start,
             annotate=not args.no_annotate,
+            cache_file=args.cache,
         )
 
-        print(f"✓ Tree structure saved to '{args.output}'")
+        print(f"✓ Tree structure saved to '{output}'")
         print(f"  {dirs} directories, {files} files")
 
     return 0
@@ -1,6 +1,15 @@
 # Core tree generation logic
 
-from itertools import islice
+import functools
+import operator
+import os
+import re
+import shelve
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
@@ -13,6 +22,27 @@ TEE = "├─ "
 LAST = "└─ "
 EMPTY = "└─ ..."
 
+# Comment markers stripped from description lines, removed in one pass
+_STRIP_RE = re.compile(r'#|"|<!-- | -->')
+
+# Names shelve may give the on-disk description cache, depending on backend
+_CACHE_SUFFIXES = ("", ".db", ".dat", ".dir", ".bak")
+
+
+@dataclass
+class _TreeEntry:
+    """A rendered tree row whose description is resolved after traversal."""
+
+    prefix: str
+    pointer: str
+    name: str
+    path: str
+    is_dir: bool
+    annotate: bool
+    description: Optional[str] = None
+    has_init: Optional[bool] = None  # whether the scan saw an __init__.py child
+    stat_key: Optional[str] = None  # ino:mtime_ns:size, set when disk caching is on
+
 
 def get_first_line(file_path):
     """
@@ -24,62 +54,91 @@ def get_first_line(file_path):
     Returns:
         str: The first line of the file or an error message.
     """
+    # EAFP: open directly and let the error tell us the file is missing or
+    # unreadable — no stat-style precondition check, one syscall either way.
+    # This also lets callers probe for __init__.py with a single open.
+    try:
+        fd = os.open(os.fspath(file_path), os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    except (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError):
+        return " No description available."
     try:
-        with open(file_path, encoding="utf-8") as file:
-            first_line = (
-                file.readline().strip().replace("#", "").replace('"', "").replace("<!-- ", "").replace(" -->", "")
-            )
-            if not first_line:
-                return " No description available."
-            return first_line if first_line.startswith(" ") else f" {first_line}"
+        # One raw read of the file head: a first-line comment fits in 4KiB,
+        # and skipping the BufferedReader construction saves several syscalls
+        # (fstat/lseek) per file
+        try:
+            chunk = os.read(fd, 4096)
+        finally:
+            os.close(fd)
+        # Split before decoding so only the first line is ever decoded
+        first_line = _STRIP_RE.sub("", chunk.split(b"\n", 1)[0].decode("utf-8", "replace")).strip()
+        if not first_line:
+            return " No description available."
+        return first_line if first_line.startswith(" ") else f" {first_line}"
     except Exception as e:
         return f" Error reading file: {e}"
 
 
-def get_folder_description(folder_path):
+@functools.lru_cache(maxsize=4096)
+def _folder_description_cached(folder_path):
+    """Cached implementation of get_folder_description, keyed by path string."""
+    # get_first_line's EAFP open answers the existence question itself,
+    # so no separate exists() stat is needed
+    return get_first_line(os.path.join(folder_path, "__init__.py"))
+
+
+def get_folder_description(folder_path, dir_names=None):
     """
     Extract description from __init__.py if it exists in the folder.
 
     Args:
-        folder_path (Path): Path to the folder.
+        folder_path (Path or str): Path to the folder.
+        dir_names (collection, optional): Child names already listed for the
+            folder; when given, detecting __init__.py needs no extra stat.
 
     Returns:
         str: The description from __init__.py or "No description available."
     """
-    init_file_path = folder_path / "__init__.py"
-    if init_file_path.exists():
-        return get_first_line(init_file_path)
-    return " No description available."
+    if dir_names is not None:
+        if "__init__.py" in dir_names:
+            return get_first_line(os.path.join(os.fspath(folder_path), "__init__.py"))
+        return " No description available."
+    return _folder_description_cached(os.fspath(folder_path))
 
 
-def tree(
+# Let callers (and tests) reset the memoized descriptions between runs
+get_folder_description.cache_clear = _folder_description_cached.cache_clear
+
+
+def _generate(
     dir_path: Path,
     ignore_file: Optional[str] = None,
     level: int = -1,
     limit_to_directories: bool = False,
     length_limit: int = 1000,
-    output_file: Optional[str] = "tree_structure.txt",
     annotation_start: int = 42,
     annotate: bool = True,
+    cache_file: Optional[str] = None,
 ):
     """
-    Generate and save a visual tree structure of a directory, respecting ignore rules.
+    Run the traversal once and return (directories, files, line iterator).
 
-    Args:
-        dir_path (Path): Path to the directory to analyze.
-        ignore_file (str): Path to ignore file (.gitignore, .treeignore, etc.).
-                          If None, searches for .treeignore then .gitignore in dir_path.
-                          If still not found, no files are ignored.
-        level (int): Depth level for tree traversal. Default is -1 (no limit).
-        limit_to_directories (bool): If True, only include directories. Default is False.
-        length_limit (int): Maximum number of lines to write to the output file. Default is 1000.
-        output_file (str): Path to the output file where the tree structure will be saved. Default is "tree_structure.txt".
-        annotation_start (int): Column position for description alignment. Default is 42.
-
-    Returns:
-        tuple: A tuple containing (directories_count, files_count)
+    Shared by tree() and embed_tree_in_file() so each sink consumes a single
+    traversal instead of re-walking the directory.
     """
     dir_path = Path(dir_path)
+    use_cache = cache_file is not None and annotate and not limit_to_directories
+    # Keep the cache's shelve files out of the rendered tree at any depth —
+    # including leftovers from earlier --cache runs, so they stay hidden even
+    # when caching is off now. Default-name files are matched by name alone;
+    # an explicit cache_file is matched by full path, so only the shelve files
+    # beside it are skipped, not unrelated files that merely share its name.
+    default_cache_names = {".annotree_cache" + suffix for suffix in _CACHE_SUFFIXES}
+    cache_names = set(default_cache_names)
+    cache_paths = frozenset()
+    if cache_file is not None:
+        cache_names.update(os.path.basename(cache_file) + suffix for suffix in _CACHE_SUFFIXES)
+        cache_abs = os.path.abspath(cache_file)
+        cache_paths = frozenset(cache_abs + suffix for suffix in _CACHE_SUFFIXES)
 
     # Auto-detect ignore file if not specified
     if ignore_file is None:
@@ -99,79 +158,254 @@ def tree(
 
     if ignore_file and Path(ignore_file).exists():
         gitignore = parse_gitignore(ignore_file, base_dir=dir_path)
+
+        # Memoize match results per path: every directory is matched twice
+        # (main filter + empty-folder check), and pattern matching is O(patterns)
+        @functools.lru_cache(maxsize=None)
+        def ignored(path: str) -> bool:
+            return gitignore(path)
     else:
-        gitignore = no_ignore
+        # No ignore file: nothing to match, so skip the matcher and its cache
+        ignored = no_ignore
 
     files = 0
     directories = 0
-    output_lines = []
-
-    def inner(directory: Path, prefix: str = "", level: int = -1):
-        nonlocal files, directories
-        if level == 0:
-            return
-        # Get directories and files separately
+    truncated = False
+    # Phase 1 collects rows (plain strings or _TreeEntry records), phase 2
+    # resolves descriptions, phase 3 formats — so traversal never blocks on
+    # per-file reads and the I/O phase can run in parallel
+    rows = []
+
+    rows.append(dir_path.name)
+
+    # Explicit DFS worklist instead of recursion: no generator/call frames per
+    # directory and no recursion-depth cap on deep trees. Items are
+    #   ("scan", directory, prefix, level, entry_row_or_None)  list a directory
+    #   ("file", entry_row)                                    emit a file row
+    #   ("row", line)                                          emit a literal row
+    # and children are pushed in reverse so pops preserve the rendered order.
+    stack = deque([("scan", str(dir_path), "", level, None)])
+    # Bind the hot callables once; attribute lookups add up over large trees
+    pop = stack.pop
+    push = stack.append
+    add_row = rows.append
+    scandir = os.scandir
+    name_key = operator.attrgetter("name")
+    while stack:
+        if len(rows) > length_limit:
+            truncated = True
+            break
+        item = pop()
+        kind = item[0]
+        if kind == "row":
+            add_row(item[1])
+            continue
+        if kind == "file":
+            add_row(item[1])
+            files += 1
+            continue
+
+        _, directory, prefix, lvl, entry_row = item
+        if entry_row is not None:
+            add_row(entry_row)
+            directories += 1
+
+        if lvl == 0:
+            if entry_row is None:
+                continue
+            # Pruned by depth: only check whether anything is visible
+            try:
+                with scandir(directory) as it:
+                    if not any(not ignored(e.path) for e in it):
+                        add_row(prefix + EMPTY)
+            except PermissionError:
+                pass
+            add_row(prefix.rstrip())
+            continue
+
+        # Filter, classify, and spot __init__.py in one streaming pass over
+        # the scandir iterator — no intermediate entries list. DirEntry
+        # reuses the type information readdir already returned, so regular
+        # entries classify without a stat; only symlinks cost one stat to
+        # resolve their target (and DirEntry caches it for the later
+        # re-check). Entries that are neither directory nor file (sockets,
+        # broken links) count as visible but are not rendered.
+        subdirs = []
+        subfiles = []
+        visible = 0
+        saw_init = False
         try:
-            contents = [p for p in directory.iterdir() if not gitignore(str(p))]
+            with scandir(directory) as it:
+                for e in it:
+                    if ignored(e.path):
+                        continue
+                    # Name check first keeps the abspath call off the hot path
+                    if e.name in cache_names and (
+                        e.name in default_cache_names or os.path.abspath(e.path) in cache_paths
+                    ):
+                        continue
+                    visible += 1
+                    if e.name == "__init__.py":
+                        saw_init = True
+                    if e.is_dir():
+                        subdirs.append(e)
+                    elif e.is_file():
+                        subfiles.append(e)
         except PermissionError:
-            return
-
-        directories_list = [p for p in contents if p.is_dir()]
-        files_list = [p for p in contents if p.is_file()]
-
-        # Sort directories and files separately
-        directories_list.sort(key=lambda p: p.name)
-        files_list.sort(key=lambda p: p.name)
-
-        # Combine sorted lists
-        sorted_contents = directories_list + files_list
-
-        pointers = [TEE] * (len(sorted_contents) - 1) + [LAST]
-        for pointer, path in zip(pointers, sorted_contents):
-            if path.is_dir():
-                description = get_folder_description(path)
-                line = prefix + pointer + path.name
-                if annotate:
-                    line = line.ljust(annotation_start) + f"#{description}"
-                output_lines.append(line)
-                directories += 1
-                extension = BRANCH if pointer == TEE else SPACE
-                yield from inner(path, prefix=prefix + extension, level=level - 1)
-
-                # Check if folder is empty or all children are ignored
-                try:
-                    if not any(not gitignore(str(item)) for item in path.iterdir()):
-                        output_lines.append(prefix + extension + EMPTY)
-                except PermissionError:
-                    pass
-                output_lines.append((prefix + extension).rstrip())
-
+            if entry_row is not None:
+                add_row(prefix.rstrip())
+            continue
+
+        if entry_row is not None:
+            if annotate:
+                # The listing already told us whether __init__.py exists,
+                # so the description phase can skip its stat
+                entry_row.has_init = saw_init
+            # Folder is empty or all children are ignored; the connector row
+            # goes under the children so it pops after the whole subtree
+            if not visible:
+                add_row(prefix + EMPTY)
+            push(("row", prefix.rstrip()))
+
+        # attrgetter's C-level key avoids a tuple-building lambda
+        subdirs.sort(key=name_key)
+        subfiles.sort(key=name_key)
+        contents = subdirs + subfiles
+
+        # Build each child prefix once per directory, not once per child
+        branch_prefix = prefix + BRANCH
+        space_prefix = prefix + SPACE
+
+        pointers = [TEE] * (len(contents) - 1) + [LAST]
+        for pointer, entry in reversed(list(zip(pointers, contents))):
+            if entry.is_dir():
+                row = _TreeEntry(prefix, pointer, entry.name, entry.path, True, annotate)
+                child_prefix = branch_prefix if pointer == TEE else space_prefix
+                push(("scan", entry.path, child_prefix, lvl - 1, row))
             elif not limit_to_directories:
                 # Skip annotation for __init__.py since it's already used for folder description
-                if path.name == "__init__.py":
-                    line = prefix + pointer + path.name
-                else:
-                    line = prefix + pointer + path.name
-                    if annotate:
-                        description = get_first_line(path)
-                        line = line.ljust(annotation_start) + f"#{description}"
-                output_lines.append(line)
-                files += 1
-
-    output_lines.append(dir_path.name)
-    iterator = inner(dir_path, level=level)
-    for line in islice(iterator, length_limit):
-        output_lines.append(line)
-    if next(iterator, None):
-        output_lines.append(f"... length_limit, {length_limit}, reached, counted:")
-    output_lines.append(f"\n{directories} directories" + (f", {files} files" if files else ""))
+                wants_description = annotate and entry.name != "__init__.py"
+                row = _TreeEntry(prefix, pointer, entry.name, entry.path, False, wants_description)
+                if use_cache and wants_description:
+                    # Key the disk cache on identity + freshness of the file
+                    # get_first_line actually reads — through symlinks, so a
+                    # link's entry goes stale when its target changes. The
+                    # DirEntry caches this stat from the earlier is_file()
+                    try:
+                        st = entry.stat()
+                        row.stat_key = f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+                    except OSError:
+                        pass
+                push(("file", row))
+
+    # Phase 2: resolve descriptions in parallel — each lookup is independent
+    # I/O, so overlapping the reads hides per-file open/read latency
+    def describe(entry: _TreeEntry) -> str:
+        if entry.is_dir:
+            if entry.has_init is None:
+                return get_folder_description(entry.path)
+            return get_folder_description(entry.path, ("__init__.py",) if entry.has_init else ())
+        return get_first_line(entry.path)
+
+    pending = [row for row in rows if isinstance(row, _TreeEntry) and row.annotate]
+
+    # Serve repeat invocations from the on-disk cache; the stat-derived key
+    # invalidates itself whenever a file's mtime or size changes
+    cache = shelve.open(cache_file) if use_cache else None
+    if cache is not None:
+        misses = []
+        for entry in pending:
+            description = cache.get(entry.stat_key) if entry.stat_key else None
+            if description is None:
+                misses.append(entry)
+            else:
+                entry.description = description
+        pending = misses
+
+    if len(pending) < 16:
+        # Spinning up a pool costs more than it saves on a handful of reads
+        for entry in pending:
+            entry.description = describe(entry)
+    else:
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            for entry, description in zip(pending, executor.map(describe, pending)):
+                entry.description = description
+
+    if cache is not None:
+        for entry in pending:
+            if entry.stat_key and entry.description is not None:
+                cache[entry.stat_key] = entry.description
+        cache.close()
+
+    # Phase 3: compose the output lines lazily so the file sink can stream
+    # them straight to disk without a second full-tree list
+    pad = " " * annotation_start  # shared padding source, sliced instead of ljust
+
+    def compose():
+        for row in rows:
+            if isinstance(row, _TreeEntry):
+                line = row.prefix + row.pointer + row.name
+                if row.annotate:
+                    line = line + pad[len(line) :] + "#" + row.description
+                yield line
+            else:
+                yield row
+        if truncated:
+            yield f"... length_limit, {length_limit}, reached, counted:"
+        yield f"\n{directories} directories" + (f", {files} files" if files else "")
+
+    return directories, files, compose()
+
+
+def tree(
+    dir_path: Path,
+    ignore_file: Optional[str] = None,
+    level: int = -1,
+    limit_to_directories: bool = False,
+    length_limit: int = 1000,
+    output_file: Optional[str] = "tree_structure.txt",
+    annotation_start: int = 42,
+    annotate: bool = True,
+    cache_file: Optional[str] = None,
+):
+    """
+    Generate and save a visual tree structure of a directory, respecting ignore rules.
+
+    Args:
+        dir_path (Path): Path to the directory to analyze.
+        ignore_file (str): Path to ignore file (.gitignore, .treeignore, etc.).
+                          If None, searches for .treeignore then .gitignore in dir_path.
+                          If still not found, no files are ignored.
+        level (int): Depth level for tree traversal. Default is -1 (no limit).
+        limit_to_directories (bool): If True, only include directories. Default is False.
+        length_limit (int): Maximum number of lines to write to the output file. Default is 1000.
+        output_file (str): Path to the output file where the tree structure will be saved. Default is "tree_structure.txt".
+        annotation_start (int): Column position for description alignment. Default is 42.
+        cache_file (str): Optional path to an on-disk description cache; speeds up
+                          repeated runs over the same tree. Default is None (no cache).
+
+    Returns:
+        tuple: A tuple containing (directories_count, files_count)
+    """
+    directories, files, lines = _generate(
+        dir_path=dir_path,
+        ignore_file=ignore_file,
+        level=level,
+        limit_to_directories=limit_to_directories,
+        length_limit=length_limit,
+        annotation_start=annotation_start,
+        annotate=annotate,
+        cache_file=cache_file,
+    )
 
     # If output_file is None, return the generated lines instead of writing
     if output_file is None:
-        return directories, files, output_lines
+        return directories, files, list(lines)
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(output_lines))
+    # writelines skips the tree-sized intermediate string a join would build,
+    # and the large buffer amortizes write syscalls
+    with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.writelines(line + "\n" for line in lines)
 
     return directories, files
 
@@ -193,33 +427,43 @@ def embed_tree_in_file(
 
     Returns True if the file was changed, False if tags not found or no change.
     """
-    target_file = Path(target_file)
-    if not target_file.exists():
-        raise FileNotFoundError(f"Target file '{target_file}' does not exist")
-
     # Generate tree as lines
-    dirs, files, lines = tree(
+    dirs, files, lines = _generate(
         dir_path=dir_path,
         ignore_file=ignore_file,
         level=level,
         limit_to_directories=limit_to_directories,
         length_limit=length_limit,
-        output_file=None,
         annotation_start=annotation_start,
         annotate=annotate,
     )
 
-    tree_text = "\n".join(lines)
+    return _embed_text(target_file, "\n".join(lines), start_tag=start_tag, end_tag=end_tag)
+
+
+def _embed_text(
+    target_file: Path,
+    tree_text: str,
+    start_tag: str = "<!-- ANNOTREE:START -->",
+    end_tag: str = "<!-- ANNOTREE:END -->",
+):
+    """Splice tree_text between the tags in target_file; returns True if changed."""
+    target_file = Path(target_file)
+    if not target_file.exists():
+        raise FileNotFoundError(f"Target file '{target_file}' does not exist")
 
     # Read target file
     content = target_file.read_text(encoding="utf-8")
 
-    if start_tag not in content or end_tag not in content:
+    # Locate the tags by index — one scan each, no intermediate split lists
+    start = content.find(start_tag)
+    end = content.find(end_tag, start + len(start_tag)) if start >= 0 else -1
+    if start < 0 or end < 0:
         # Tags not found
         return False
 
-    before, rest = content.split(start_tag, 1)
-    _, after = rest.split(end_tag, 1)
+    before = content[:start]
+    after = content[end + len(end_tag) :]
 
     # Prepare replacement: fenced code block
     replacement = f"{start_tag}\n```text\n{tree_text}\n```\n{end_tag}"
@@ -229,5 +473,17 @@ def embed_tree_in_file(
     if new_content == content:
         return False
 
-    target_file.write_text(new_content, encoding="utf-8")
+    # Write to a sibling temp file and swap it in, so a concurrent reader
+    # (e.g. a CI job) never sees a half-written target
+    fd, tmp_path = tempfile.mkstemp(dir=str(target_file.parent), prefix=target_file.name + ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(new_content)
+        # mkstemp creates the temp file as 0600; carry over the target's mode
+        # so the swap doesn't tighten its permissions
+        shutil.copymode(str(target_file), tmp_path)
+        os.replace(tmp_path, target_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
     return True
@@ -4,188 +4,227 @@
 Basic tests for annotree functionality.
 """
 
-import tempfile
-from pathlib import Path
+import os
 
 import pytest
 
 from annotree import get_first_line, get_folder_description, tree
 
 
-def test_get_first_line():
-    """Test extracting first line from a file."""
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".py") as f:
-        f.write("# This is a test comment\n")
-        f.write("def test():\n")
-        f.write("    pass\n")
-        temp_path = Path(f.name)
-
+def _write(path, data: bytes):
+    """Create a file with raw bytes, skipping the text-codec write path."""
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
     try:
-        result = get_first_line(temp_path)
-        assert "This is a test comment" in result
+        os.write(fd, data)
     finally:
-        temp_path.unlink()
+        os.close(fd)
+
+
+@pytest.fixture
+def sample_py(tmp_path):
+    """A small Python file with a first-line comment."""
+    path = tmp_path / "sample.py"
+    path.write_text("# This is a test comment\ndef test():\n    pass\n")
+    return path
 
 
-def test_get_first_line_empty():
+def test_get_first_line(sample_py):
+    """Test extracting first line from a file."""
+    result = get_first_line(sample_py)
+    assert "This is a test comment" in result
+
+
+def test_get_first_line_empty(tmp_path):
     """Test extracting first line from an empty file."""
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".py") as f:
-        f.write("\n")
-        temp_path = Path(f.name)
+    empty_py = tmp_path / "empty.py"
+    empty_py.write_text("\n")
 
-    try:
-        result = get_first_line(temp_path)
-        assert "No description available" in result
-    finally:
-        temp_path.unlink()
+    result = get_first_line(empty_py)
+    assert "No description available" in result
 
 
-def test_get_folder_description_with_init():
+def test_get_folder_description_with_init(tmp_path):
     """Test getting folder description from __init__.py."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_path = Path(tmpdir)
-        init_file = temp_path / "__init__.py"
-        init_file.write_text("# Test package\n")
+    init_file = tmp_path / "__init__.py"
+    init_file.write_text("# Test package\n")
 
-        result = get_folder_description(temp_path)
-        assert "Test package" in result
+    result = get_folder_description(tmp_path)
+    assert "Test package" in result
 
 
-def test_get_folder_description_no_init():
+def test_get_folder_description_no_init(tmp_path):
     """Test getting folder description without __init__.py."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_path = Path(tmpdir)
-
-        result = get_folder_description(temp_path)
-        assert "No description available" in result
+    result = get_folder_description(tmp_path)
+    assert "No description available" in result
 
 
-def test_tree_generation():
+def test_tree_generation(tmp_path):
     """Test basic tree generation."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_path = Path(tmpdir)
+    # Create some test files and directories
+    _write(tmp_path / "test.py", b"# Test file\n")
+    (tmp_path / "subdir").mkdir()
+    _write(tmp_path / "subdir" / "another.py", b"# Another test\n")
 
-        # Create some test files and directories
-        (temp_path / "test.py").write_text("# Test file\n")
-        (temp_path / "subdir").mkdir()
-        (temp_path / "subdir" / "another.py").write_text("# Another test\n")
+    output_file = tmp_path / "tree_output.txt"
 
-        output_file = temp_path / "tree_output.txt"
+    dirs, files = tree(dir_path=tmp_path, output_file=str(output_file))
 
-        dirs, files = tree(dir_path=temp_path, output_file=str(output_file))
+    assert output_file.exists()
+    assert dirs >= 1
+    assert files >= 2
 
-        assert output_file.exists()
-        assert dirs >= 1
-        assert files >= 2
+    content = output_file.read_text()
+    assert "test.py" in content or "another.py" in content
 
-        content = output_file.read_text()
-        assert "test.py" in content or "another.py" in content
 
-
-def test_tree_with_depth_limit():
+def test_tree_with_depth_limit(tmp_path):
     """Test tree generation with depth limit."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_path = Path(tmpdir)
-
-        # Create nested directories
-        (temp_path / "level1").mkdir()
-        (temp_path / "level1" / "level2").mkdir()
-        (temp_path / "level1" / "level2" / "level3").mkdir()
-        (temp_path / "level1" / "level2" / "level3" / "test.txt").write_text("deep")
+    # Create nested directories
+    (tmp_path / "level1").mkdir()
+    (tmp_path / "level1" / "level2").mkdir()
+    (tmp_path / "level1" / "level2" / "level3").mkdir()
+    _write(tmp_path / "level1" / "level2" / "level3" / "test.txt", b"deep")
 
-        output_file = temp_path / "tree_output.txt"
+    output_file = tmp_path / "tree_output.txt"
 
-        dirs, files = tree(dir_path=temp_path, level=2, output_file=str(output_file))
+    dirs, files = tree(dir_path=tmp_path, level=2, output_file=str(output_file))
 
-        assert output_file.exists()
-        content = output_file.read_text()
+    assert output_file.exists()
+    content = output_file.read_text()
 
-        # Should include level1 and level2, but not level3
-        assert "level1" in content
-        assert "level2" in content
+    # Should include level1 and level2, but not level3
+    assert "level1" in content
+    assert "level2" in content
 
 
-def test_tree_directories_only():
+def test_tree_directories_only(tmp_path):
     """Test tree generation with directories only."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_path = Path(tmpdir)
+    # Create files and directories
+    _write(tmp_path / "test.py", b"# Test file\n")
+    (tmp_path / "subdir").mkdir()
+
+    output_file = tmp_path / "tree_output.txt"
+
+    dirs, files = tree(dir_path=tmp_path, limit_to_directories=True, output_file=str(output_file))
+
+    assert output_file.exists()
+    assert dirs >= 1
+    assert files == 0  # Should be 0 when limit_to_directories is True
 
-        # Create files and directories
-        (temp_path / "test.py").write_text("# Test file\n")
-        (temp_path / "subdir").mkdir()
 
-        output_file = temp_path / "tree_output.txt"
+def test_tree_cache_second_run_identical(tmp_path):
+    """Test that a cached rerun produces the same output as the first run."""
+    _write(tmp_path / "test.py", b"# Test file\n")
+    (tmp_path / "subdir").mkdir()
+    _write(tmp_path / "subdir" / "another.py", b"# Another test\n")
 
-        dirs, files = tree(dir_path=temp_path, limit_to_directories=True, output_file=str(output_file))
+    cache_file = str(tmp_path / "cache")
 
-        assert output_file.exists()
-        assert dirs >= 1
-        assert files == 0  # Should be 0 when limit_to_directories is True
+    dirs1, files1, lines1 = tree(dir_path=tmp_path, output_file=None, cache_file=cache_file)
+    dirs2, files2, lines2 = tree(dir_path=tmp_path, output_file=None, cache_file=cache_file)
 
+    assert (dirs1, files1) == (dirs2, files2)
+    assert lines1 == lines2
+    assert any("Test file" in line for line in lines2)
 
-def test_embed_tree_in_file():
+
+def test_tree_cache_refreshes_changed_file(tmp_path):
+    """Test that modifying a file invalidates its cached description."""
+    _write(tmp_path / "test.py", b"# Old description\n")
+
+    cache_file = str(tmp_path / "cache")
+
+    _, _, lines = tree(dir_path=tmp_path, output_file=None, cache_file=cache_file)
+    assert any("Old description" in line for line in lines)
+
+    _write(tmp_path / "test.py", b"# New description, longer\n")
+
+    _, _, lines = tree(dir_path=tmp_path, output_file=None, cache_file=cache_file)
+    assert any("New description" in line for line in lines)
+    assert not any("Old description" in line for line in lines)
+
+
+def test_tree_cache_files_hidden(tmp_path):
+    """Test that the cache's shelve files never show up in the tree."""
+    _write(tmp_path / "test.py", b"# Test file\n")
+    (tmp_path / "subdir").mkdir()
+    _write(tmp_path / "subdir" / "another.py", b"# Another test\n")
+    # An unrelated file sharing the cache's name must still render
+    _write(tmp_path / "mycache.py", b"# Not a cache\n")
+
+    cache_file = str(tmp_path / "subdir" / "mycache")
+
+    tree(dir_path=tmp_path, output_file=None, cache_file=cache_file)
+    _, _, lines = tree(dir_path=tmp_path, output_file=None, cache_file=cache_file)
+
+    content = "\n".join(lines)
+    for suffix in (".db", ".dat", ".dir", ".bak"):
+        assert "mycache" + suffix not in content
+    assert "mycache.py" in content
+
+    # Default-name leftovers stay hidden even without caching
+    _write(tmp_path / "subdir" / ".annotree_cache.db", b"leftover")
+    _, _, lines = tree(dir_path=tmp_path, output_file=None)
+    assert ".annotree_cache" not in "\n".join(lines)
+
+
+def test_embed_tree_in_file(tmp_path):
     """Test embedding tree into a file between tags."""
     from annotree import embed_tree_in_file
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_path = Path(tmpdir)
-
-        # Create a simple file structure
-        (temp_path / "test.py").write_text("# Test file\n")
-        (temp_path / "subdir").mkdir()
-        (temp_path / "subdir" / "another.py").write_text("# Another test\n")
-
-        # Create a target file with tags
-        target_file = temp_path / "README.md"
-        target_file.write_text(
-            "# My Project\n\n## File Structure\n\n<!-- ANNOTREE:START -->\n<!-- ANNOTREE:END -->\n\n## More content\n"
-        )
-
-        # Embed the tree
-        changed = embed_tree_in_file(
-            target_file=target_file,
-            dir_path=temp_path,
-            annotate=False,
-        )
-
-        assert changed is True
-        content = target_file.read_text()
-
-        # Should contain the tags and a code block
-        assert "<!-- ANNOTREE:START -->" in content
-        assert "<!-- ANNOTREE:END -->" in content
-        assert "```text" in content
-        assert "test.py" in content or "subdir" in content
-
-        # Test no change when running again
-        changed_again = embed_tree_in_file(
-            target_file=target_file,
-            dir_path=temp_path,
-            annotate=False,
-        )
-        assert changed_again is False
-
-
-def test_embed_tree_no_tags():
+    # Create a simple file structure
+    _write(tmp_path / "test.py", b"# Test file\n")
+    (tmp_path / "subdir").mkdir()
+    _write(tmp_path / "subdir" / "another.py", b"# Another test\n")
+
+    # Create a target file with tags
+    target_file = tmp_path / "README.md"
+    target_file.write_text(
+        "# My Project\n\n## File Structure\n\n<!-- ANNOTREE:START -->\n<!-- ANNOTREE:END -->\n\n## More content\n"
+    )
+
+    # Embed the tree
+    changed = embed_tree_in_file(
+        target_file=target_file,
+        dir_path=tmp_path,
+        annotate=False,
+    )
+
+    assert changed is True
+    content = target_file.read_text()
+
+    # Should contain the tags and a code block
+    assert "<!-- ANNOTREE:START -->" in content
+    assert "<!-- ANNOTREE:END -->" in content
+    assert "```text" in content
+    assert "test.py" in content or "subdir" in content
+
+    # Test no change when running again
+    changed_again = embed_tree_in_file(
+        target_file=target_file,
+        dir_path=tmp_path,
+        annotate=False,
+    )
+    assert changed_again is False
+
+
+def test_embed_tree_no_tags(tmp_path):
     """Test embedding when tags are missing."""
     from annotree import embed_tree_in_file
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_path = Path(tmpdir)
-
-        # Create a target file WITHOUT tags
-        target_file = temp_path / "README.md"
-        target_file.write_text("# My Project\n\nNo tags here.\n")
+    # Create a target file WITHOUT tags
+    target_file = tmp_path / "README.md"
+    target_file.write_text("# My Project\n\nNo tags here.\n")
 
-        # Try to embed - should return False
-        changed = embed_tree_in_file(
-            target_file=target_file,
-            dir_path=temp_path,
-        )
+    # Try to embed - should return False
+    changed = embed_tree_in_file(
+        target_file=target_file,
+        dir_path=tmp_path,
+    )
 
-        assert changed is False
-        # Original content should be unchanged
-        assert target_file.read_text() == "# My Project\n\nNo tags here.\n"
+    assert changed is False
+    # Original content should be unchanged
+    assert target_file.read_text() == "# My Project\n\nNo tags here.\n"
 
 
 if __name__ == "__main__":